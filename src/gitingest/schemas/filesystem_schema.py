@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import os
+import sys
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from pathlib import Path
@@ -12,6 +13,9 @@ from gitingest.utils.notebook_utils import process_notebook
 
 SEPARATOR = "=" * 48  # Tiktoken, the tokenizer openai uses, counts 2 tokens if we have more than 48
 
+# Dataclass slots are only available from Python 3.10
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
 
 class FileSystemNodeType(Enum):
     """Enum representing the type of a file system node (directory or file)."""
@@ -30,12 +34,13 @@ class FileSystemStats:
     total_size: int = 0
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class FileSystemNode:  # pylint: disable=too-many-instance-attributes
     """
     Class representing a node in the file system (either a file or directory).
 
     Tracks properties of files/directories for comprehensive analysis.
+    Instances are slotted where supported, since a repository walk can create tens of thousands of them.
     """
 
     name: str
@@ -47,6 +52,8 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
     dir_count: int = 0
     depth: int = 0
     children: list[FileSystemNode] = field(default_factory=list)
+    # The file content, when read ahead of time by callers that prefetch contents in bulk
+    cached_content: str | None = field(default=None, init=False, repr=False, compare=False)
 
     def sort_children(self) -> None:
         """
@@ -105,6 +112,8 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
         """
         Read the content of a file if it's text (or a notebook). Return an error message otherwise.
 
+        If ``cached_content`` is set, it is returned without touching the file.
+
         Returns
         -------
         str
@@ -118,6 +127,9 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
         if self.type == FileSystemNodeType.DIRECTORY:
             raise ValueError("Cannot read content of a directory node")
 
+        if self.cached_content is not None:
+            return self.cached_content
+
         if self.type == FileSystemNodeType.SYMLINK:
             return ""
 
@@ -1,46 +1,99 @@
 """This module defines the FastAPI router for the tree explorer feature."""
 
-import json
-from typing import Dict, Any, Optional
-from fastapi import APIRouter, Form, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+import asyncio
+import hashlib
+import os
+import uuid
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, Form, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
-from gitingest.query_parsing import parse_query
 from gitingest.cloning import clone_repo
-from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats
-from pathlib import Path
-from server.server_config import templates
-from server.server_utils import limiter
+from gitingest.config import TMP_BASE_PATH
+from gitingest.ingestion import _process_node
+from gitingest.query_parsing import parse_query
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats, IngestionQuery
+from gitingest.utils.git_utils import run_command
+from server.server_config import (
+    CLONE_CONCURRENCY,
+    CONTENT_PREFETCH_CONCURRENCY,
+    DELETE_REPO_AFTER,
+    ENCODED_TREE_DATA_CACHE_SIZE,
+    MAX_PREFETCH_SIZE,
+    MAX_TREE_DEPTH,
+    MAX_TREE_NODES,
+    PARSED_QUERY_CACHE_SIZE,
+    PARSED_QUERY_CACHE_TTL,
+    TREE_DATA_CACHE_SIZE,
+    TREE_DATA_CACHE_TTL,
+    WALKED_FILES_CACHE_SIZE,
+    templates,
+)
+from server.server_utils import sliding_window_limiter as limiter
+from server.tree_serialization import (
+    _content_is_elided,
+    _extension_from_name,
+    _filesystem_node_to_columns,
+    _filesystem_node_to_flat,
+    _iter_filesystem_node_json,
+)
 
 router = APIRouter()
 
+# Shapes of tree data accepted by the ``layout`` form field
+_TREE_LAYOUTS = ("nested", "columns", "flat")
 
-def _filesystem_node_to_json(node: FileSystemNode) -> Dict[str, Any]:
-    """
-    Convert a FileSystemNode to a JSON-serializable dictionary.
-    
-    For files, includes content. For directories, includes children.
-    Each node has metadata like type, size, extension, etc.
-    """
-    result = {
-        "name": node.name,
-        "type": node.type.name.lower(),
-        "path": node.path_str,
-        "size": node.size,
-        "depth": node.depth,
-        "file_count": node.file_count,
-        "dir_count": node.dir_count,
-    }
-    
-    if node.type == FileSystemNodeType.FILE:
-        # For files, add content and extension
-        result["content"] = node.content
-        result["extension"] = node.path.suffix.lower() if node.path.suffix else ""
-    elif node.type == FileSystemNodeType.DIRECTORY:
-        # For directories, add children
-        result["children"] = [_filesystem_node_to_json(child) for child in node.children]
-    
-    return result
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the standard library encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+@dataclass
+class _WalkedRepository:
+    """A cloned repository whose file structure has been walked."""
+
+    query: IngestionQuery
+    root_node: FileSystemNode
+    # SHA of the cloned HEAD, or None if it could not be resolved
+    head_commit: Optional[str] = None
+
+
+def _repository_node_count(repository: _WalkedRepository) -> int:
+    """Return the number of nodes in a walked repository, its weight in ``_TREE_DATA_CACHE``."""
+    return 1 + repository.root_node.file_count + repository.root_node.dir_count
+
+
+# Walked repositories, keyed by (url, commit or branch, type, subpath, max_file_size) and weighted by node count.
+# Every layout is encoded from the same walk.
+_TREE_DATA_CACHE: TTLCache = TTLCache(
+    maxsize=TREE_DATA_CACHE_SIZE, ttl=TREE_DATA_CACHE_TTL, getsizeof=_repository_node_count
+)
+# Encoded tree data responses, keyed by the walk's cache key, repo id, layout and include_content, and weighted by
+# length. The repo id is unique to each walk, so a repository walked again never picks up an earlier walk's encodings.
+_ENCODED_TREE_DATA_CACHE: TTLCache = TTLCache(
+    maxsize=ENCODED_TREE_DATA_CACHE_SIZE, ttl=TREE_DATA_CACHE_TTL, getsizeof=len
+)
+# Parsed queries for public repositories, keyed by (repo_url, max_file_size)
+_PARSED_QUERY_CACHE: TTLCache = TTLCache(maxsize=PARSED_QUERY_CACHE_SIZE, ttl=PARSED_QUERY_CACHE_TTL)
+# Paths of the files found by each tree explorer walk, the only ones /api/file-content serves. Keyed by
+# (repo id, slug) and weighted by path count; entries live as long as the clone itself.
+_WALKED_FILES: TTLCache = TTLCache(maxsize=WALKED_FILES_CACHE_SIZE, ttl=DELETE_REPO_AFTER, getsizeof=len)
+# Bound the number of clones and filesystem walks running at the same time, one semaphore per event loop
+_CLONE_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+_TREE_DATA_LOCKS: "weakref.WeakValueDictionary[Tuple[Any, ...], asyncio.Lock]" = weakref.WeakValueDictionary()
 
 
 @router.get("/tree-explorer", response_class=HTMLResponse)
@@ -57,87 +110,506 @@ async def tree_explorer_page(request: Request) -> HTMLResponse:
     )
 
 
-@router.post("/api/tree-data", response_class=JSONResponse)
+@router.post("/api/tree-data", response_class=ORJSONResponse)
 @limiter.limit("5/minute")
 async def get_tree_data(
     request: Request,
     repo_url: str = Form(...),
     token: str = Form(""),
     max_file_size: int = Form(10 * 1024 * 1024),  # 10MB default
-) -> JSONResponse:
+    layout: str = Form("nested"),
+    include_content: bool = Form(False),
+) -> Response:
     """
     Clone a repository and return its structure as JSON for tree visualization.
     
     This endpoint processes a git repository URL and returns the complete
     file structure as a nested JSON object suitable for D3.js tree visualization.
+    The nested layout is streamed as it is encoded. With ``layout="columns"`` the
+    structure is returned as parallel arrays instead (see ``_filesystem_node_to_columns``),
+    which is much smaller for wide trees, and with ``layout="flat"`` as a list of nodes linked
+    by parent index (see ``_filesystem_node_to_flat``).
+
+    File contents are left out unless ``include_content`` is set; the explorer fetches them
+    one file at a time from ``/api/file-content`` instead.
+
+    Public repositories are served from a short-lived cache, keyed by URL, commit (or branch),
+    subpath and maximum file size, so repeated requests skip the clone and walk; each layout is
+    encoded once per cached walk. Requests made with a token are never cached.
+
+    Responses carry a weak ``ETag`` derived from the cloned commit, and a request whose
+    ``If-None-Match`` header matches it gets an empty 304 response instead of the tree.
     """
     try:
+        if layout not in _TREE_LAYOUTS:
+            raise ValueError(f"Unknown layout '{layout}', expected one of: {', '.join(_TREE_LAYOUTS)}")
+
         # Parse the repository URL
         resolved_token = None if token == "" else token
-        query = await parse_query(
-            repo_url, 
-            max_file_size=max_file_size,
-            from_web=True,
-            token=resolved_token
+        query = await _parse_tree_query(repo_url, max_file_size=max_file_size, token=resolved_token)
+
+        encoding_key: Optional[Tuple[Any, ...]] = None
+        if resolved_token is not None:
+            repository = await _walk_repository(query, token=resolved_token)
+        else:
+            cache_key = (query.url, query.commit or query.branch, query.type, query.subpath, max_file_size)
+            repository = _TREE_DATA_CACHE.get(cache_key)
+            if repository is None:
+                # Only one request per key clones the repository; the others wait and read the cache
+                async with _get_cache_lock(cache_key):
+                    repository = _TREE_DATA_CACHE.get(cache_key)
+                    if repository is None:
+                        repository = await _walk_repository(query, token=None)
+                        # A walk larger than the whole budget is served but not kept
+                        if _repository_node_count(repository) <= _TREE_DATA_CACHE.maxsize:
+                            _TREE_DATA_CACHE[cache_key] = repository
+            encoding_key = (*cache_key, repository.query.id, layout, include_content)
+
+        etag = _tree_data_etag(repository, layout=layout, include_content=include_content)
+        # The client already holds this exact tree; skip the body and its serialization
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=_cache_headers(etag))
+
+        payload = None if encoding_key is None else _ENCODED_TREE_DATA_CACHE.get(encoding_key)
+        if payload is not None:
+            return Response(content=payload, media_type="application/json", headers=_cache_headers(etag))
+        return await _tree_data_response(
+            repository,
+            layout=layout,
+            include_content=include_content,
+            etag=etag,
+            encoding_key=encoding_key,
+        )
+
+    except Exception as e:
+        return ORJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": str(e)
+            }
         )
-        
+
+
+@router.get("/api/file-content", response_class=ORJSONResponse)
+@limiter.limit("60/minute")
+async def get_file_content(
+    request: Request,  # pylint: disable=unused-argument  # read by the rate limiter
+    repo_id: str,
+    slug: str,
+    path: str,
+) -> ORJSONResponse:
+    """
+    Return the content of a single file from a repository cloned by ``/api/tree-data``.
+
+    ``repo_id`` and ``slug`` come from the ``repo_info`` of the tree data response, and ``path``
+    is the ``path`` of a file node. Only files found by that walk are served, so clones made
+    elsewhere and files left out by the ignore patterns or ``max_file_size`` are not. Paths that
+    resolve outside the cloned repository, or into its ``.git`` directory, are rejected as well.
+    Errors are reported as in ``/api/tree-data``.
+    """
+    walked_files = _WALKED_FILES.get((repo_id, slug))
+    if walked_files is None:
+        return _file_content_error(404, "Unknown repository")
+    if path not in walked_files:
+        return _file_content_error(404, "File not found")
+
+    local_path = (TMP_BASE_PATH / repo_id / slug).resolve()
+    file_path = (local_path / path).resolve()
+    error = _file_path_error(local_path, file_path)
+    if error is not None:
+        return _file_content_error(400, error)
+    if not file_path.is_file():
+        return _file_content_error(404, "File not found")
+
+    node = FileSystemNode(
+        name=file_path.name,
+        type=FileSystemNodeType.FILE,
+        path_str=path,
+        path=file_path,
+        size=file_path.stat().st_size,
+    )
+    if _content_is_elided(node.name, _extension_from_name(node.name), node.size):
+        return ORJSONResponse(content={"success": True, "path": path, "content": None, "content_elided": True})
+    # Reading the file is blocking I/O; keep it off the event loop
+    content = await run_in_threadpool(getattr, node, "content")
+    return ORJSONResponse(content={"success": True, "path": path, "content": content})
+
+
+def _file_path_error(local_path: Path, file_path: Path) -> Optional[str]:
+    """
+    Return why a resolved file path may not be served from the resolved clone at ``local_path``, if it may not.
+    """
+    if local_path.parent.parent != TMP_BASE_PATH.resolve():
+        return "Invalid repository"
+    if local_path not in file_path.parents:
+        return "Path is outside of the repository"
+    if file_path.relative_to(local_path).parts[0] == ".git":
+        return "Path is inside the .git directory"
+    return None
+
+
+def _file_content_error(status_code: int, error: str) -> ORJSONResponse:
+    """
+    Return an error response of ``/api/file-content``, shaped like those of ``/api/tree-data``.
+    """
+    return ORJSONResponse(status_code=status_code, content={"success": False, "error": error})
+
+
+async def _parse_tree_query(repo_url: str, max_file_size: int, token: Optional[str]) -> IngestionQuery:
+    """
+    Parse a repository URL, reusing recent results for the same URL and maximum file size.
+
+    Parsing may hit the network (e.g. to find the host of a bare ``user/repo`` slug), so results are
+    kept for a short while. Queries made with a token are never cached. A reused query is given a
+    fresh id and local path, so that each request clones into its own directory.
+    """
+    if token is not None:
+        return await parse_query(repo_url, max_file_size=max_file_size, from_web=True, token=token)
+
+    cache_key = (repo_url, max_file_size)
+    query = _PARSED_QUERY_CACHE.get(cache_key)
+    if query is None:
+        query = await parse_query(repo_url, max_file_size=max_file_size, from_web=True)
+        _PARSED_QUERY_CACHE[cache_key] = query
+        return query
+
+    _id = str(uuid.uuid4())
+    return query.model_copy(update={"id": _id, "local_path": TMP_BASE_PATH / _id / query.slug})
+
+
+def _get_cache_lock(cache_key: Tuple[Any, ...]) -> asyncio.Lock:
+    """
+    Return the lock guarding the computation of the tree data for ``cache_key``.
+
+    Locks are held in a weak-value mapping, so they disappear once no request is using them.
+    """
+    lock = _TREE_DATA_LOCKS.get(cache_key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _TREE_DATA_LOCKS[cache_key] = lock
+    return lock
+
+
+def _file_paths(node: FileSystemNode) -> FrozenSet[str]:
+    """
+    Return the paths of the files in the tree rooted at ``node``.
+    """
+    paths = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.type is FileSystemNodeType.FILE:
+            paths.append(current.path_str)
+        else:
+            stack.extend(current.children)
+    return frozenset(paths)
+
+
+def _get_clone_semaphore() -> asyncio.Semaphore:
+    """
+    Return the semaphore bounding concurrent clones and walks on the running event loop.
+
+    The semaphore is created on first use rather than at import time: before Python 3.10, asyncio
+    primitives bind to the loop current at construction, which is not the loop serving requests.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _CLONE_SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(CLONE_CONCURRENCY)
+        _CLONE_SEMAPHORES[loop] = semaphore
+    return semaphore
+
+
+async def _walk_repository(query: IngestionQuery, token: Optional[str]) -> _WalkedRepository:
+    """
+    Clone the repository described by ``query`` and build its file structure.
+
+    At most ``CLONE_CONCURRENCY`` clones and walks run at once, so bursts of requests
+    queue up instead of competing for the disk.
+    """
+    async with _get_clone_semaphore():
         # Clone the repository
         clone_config = query.extract_clone_config()
-        await clone_repo(clone_config, token=resolved_token)
-        
+        await clone_repo(clone_config, token=token)
+
         # Process the repository to get file structure
-        from gitingest.ingestion import _process_node
-        from gitingest.schemas import FileSystemStats
-        from pathlib import Path
-        
-        subpath = Path(query.subpath.strip("/")).as_posix()
-        path = query.local_path / subpath
-        
+        # Join and slice strings rather than building intermediate PurePath objects
+        local_path_str = str(query.local_path)
+        path = Path(os.path.join(local_path_str, query.subpath.strip("/")))
+        # ``path`` always starts with the local path, so its relative form is the remainder
+        relative_path_str = str(path)[len(local_path_str) + 1 :] or "."
+
         # Create root node similar to ingest_query
         root_node = FileSystemNode(
             name=path.name or query.slug,
             type=FileSystemNodeType.DIRECTORY if path.is_dir() else FileSystemNodeType.FILE,
-            path_str=str(path.relative_to(query.local_path)),
+            path_str=relative_path_str,
             path=path,
         )
-        
+
         if path.is_dir():
             stats = FileSystemStats()
-            _process_node(
+            # The walk is blocking filesystem work; run it in a worker thread to keep the event loop free
+            await run_in_threadpool(
+                _process_node,
                 node=root_node,
                 query=query,
                 stats=stats,
             )
-        
-        # Convert to JSON structure
-        json_data = _filesystem_node_to_json(root_node)
-        
-        # Create a simple summary
-        summary = f"Repository: {query.slug}\nFiles: {root_node.file_count}\nDirectories: {root_node.dir_count}"
-        
-        # Check for empty repository
-        if root_node.file_count == 0 and root_node.dir_count == 0:
-            summary += "\nNote: Repository appears to be empty"
-        
-        return JSONResponse(content={
+
+        head_commit = await _resolve_head_commit(local_path_str)
+
+    _WALKED_FILES[(query.id, query.slug)] = _file_paths(root_node)
+
+    return _WalkedRepository(query=query, root_node=root_node, head_commit=head_commit)
+
+
+async def _prefetch_contents(
+    node: FileSystemNode,
+    breadth_first: bool,
+    max_nodes: int = MAX_TREE_NODES,
+    max_depth: int = MAX_TREE_DEPTH,
+    max_bytes: int = MAX_PREFETCH_SIZE,
+) -> List[FileSystemNode]:
+    """
+    Read ahead the content of the first files a serializer will emit, several files at a time.
+
+    Files are visited in the order the serializer emits them (breadth-first for the flat layout,
+    depth-first pre-order otherwise) and within the same limits, skipping those whose content is
+    elided. Prefetching stops once ``max_bytes`` of content is reached; the serializer reads any
+    further files itself. Up to ``CONTENT_PREFETCH_CONCURRENCY`` files are read at once in worker
+    threads, overlapping their I/O, and each content is stored in the node's ``cached_content``.
+
+    Returns the nodes whose content was read; pass them to ``_release_contents`` once the response
+    is encoded, so that cached walks do not hold on to file contents.
+    """
+    files: List[FileSystemNode] = []
+    pending: Deque[FileSystemNode] = deque([node])
+    take_next = pending.popleft if breadth_first else pending.pop
+    depth_limit = node.depth + max_depth
+    total_size = 0
+    file_type = FileSystemNodeType.FILE
+    directory_type = FileSystemNodeType.DIRECTORY
+
+    for _ in range(max_nodes):
+        if not pending:
+            break
+        current = take_next()
+        if current.type is file_type:
+            if _content_is_elided(current.name, _extension_from_name(current.name), current.size):
+                continue
+            total_size += current.size
+            if total_size > max_bytes:
+                break
+            # Files being read for another response of the same walk still count towards the budget
+            if current.cached_content is None:
+                files.append(current)
+        elif current.type is directory_type and current.depth < depth_limit:
+            pending.extend(current.children if breadth_first else reversed(current.children))
+
+    semaphore = asyncio.Semaphore(CONTENT_PREFETCH_CONCURRENCY)
+
+    async def prefetch(file_node: FileSystemNode) -> None:
+        async with semaphore:
+            file_node.cached_content = await run_in_threadpool(getattr, file_node, "content")
+
+    await asyncio.gather(*(prefetch(file_node) for file_node in files))
+    return files
+
+
+def _release_contents(nodes: List[FileSystemNode]) -> None:
+    """
+    Drop the content read ahead into ``nodes`` by ``_prefetch_contents``.
+    """
+    for node in nodes:
+        node.cached_content = None
+
+
+async def _resolve_head_commit(local_path: str) -> Optional[str]:
+    """
+    Return the SHA of the commit checked out in ``local_path``, or None if it cannot be resolved.
+    """
+    try:
+        stdout, _ = await run_command("git", "-C", local_path, "rev-parse", "HEAD")
+    except (OSError, RuntimeError):
+        return None
+    return stdout.decode().strip() or None
+
+
+def _tree_data_etag(repository: _WalkedRepository, layout: str, include_content: bool) -> Optional[str]:
+    """
+    Return the weak ETag of the tree data serialized from ``repository``, or None if its commit is unknown.
+
+    The commit fixes the files; the subpath, maximum file size, layout and content flag fix how they
+    are serialized, and the clone id sent in ``repo_info`` fixes where ``/api/file-content`` reads
+    them from. All but the commit are folded into a short digest, so a re-clone gets a new tag.
+    """
+    if repository.head_commit is None:
+        return None
+    query = repository.query
+    variant = f"{query.id}\0{query.subpath}\0{query.max_file_size}\0{layout}\0{include_content}"
+    digest = hashlib.sha256(variant.encode()).hexdigest()[:16]
+    return f'W/"{repository.head_commit}-{digest}"'
+
+
+def _etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """
+    Return whether the ``If-None-Match`` header of ``request`` lists ``etag``.
+
+    ``*`` is not honoured: for a POST, a matching wildcard would call for 412 rather than 304.
+    """
+    if etag is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    return etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+def _cache_headers(etag: Optional[str]) -> Dict[str, str]:
+    """
+    Return the caching headers of a tree data response.
+    """
+    if etag is None:
+        return {}
+    return {"ETag": etag, "Cache-Control": "private, max-age=300"}
+
+
+async def _tree_data_response(
+    repository: _WalkedRepository,
+    layout: str,
+    include_content: bool,
+    etag: Optional[str],
+    encoding_key: Optional[Tuple[Any, ...]],
+) -> Response:
+    """
+    Serialize a walked repository in the requested layout.
+
+    The nested layout is streamed; the column and flat layouts are small enough to encode in one go.
+    Both are encoded in worker threads. With ``include_content``, the first files are read ahead
+    (see ``_prefetch_contents``). With an ``encoding_key``, the encoded response is stored under it in
+    ``_ENCODED_TREE_DATA_CACHE`` once sent.
+    """
+    summary, repo_info = _summarize_repository(repository)
+    prefetched: List[FileSystemNode] = []
+    if include_content:
+        prefetched = await _prefetch_contents(repository.root_node, breadth_first=layout == "flat")
+
+    if layout == "nested":
+        chunks = _iter_tree_data(
+            repository.root_node,
+            include_content=include_content,
+            summary=summary,
+            repo_info=repo_info,
+        )
+        return StreamingResponse(
+            _stream_and_keep(chunks, encoding_key, prefetched),
+            media_type="application/json",
+            headers=_cache_headers(etag),
+        )
+
+    serialize = _filesystem_node_to_flat if layout == "flat" else _filesystem_node_to_columns
+    warnings: List[str] = []
+    try:
+        # Files past the prefetched ones are read while serializing; keep that off the event loop
+        data = await run_in_threadpool(
+            serialize,
+            repository.root_node,
+            include_content=include_content,
+            warnings=warnings,
+        )
+    finally:
+        _release_contents(prefetched)
+    payload = orjson.dumps(
+        {
             "success": True,
-            "data": json_data,
+            "data": data,
+            "warnings": warnings,
             "summary": summary,
-            "repo_info": {
-                "url": query.url,
-                "slug": query.slug,
-                "user_name": query.user_name,
-                "repo_name": query.repo_name,
-                "total_files": root_node.file_count,
-                "total_dirs": root_node.dir_count,
-            }
-        })
-        
-    except Exception as e:
-        return JSONResponse(
-            status_code=400,
-            content={
-                "success": False,
-                "error": str(e)
-            }
-        )
\ No newline at end of file
+            "repo_info": repo_info,
+        }
+    )
+    if encoding_key is not None:
+        _keep_encoding(encoding_key, payload)
+    return Response(content=payload, media_type="application/json", headers=_cache_headers(etag))
+
+
+def _summarize_repository(repository: _WalkedRepository) -> Tuple[str, Dict[str, Any]]:
+    """
+    Return the summary text and repository information sent alongside the tree data.
+    """
+    query = repository.query
+    root_node = repository.root_node
+
+    # Create a simple summary
+    summary = f"Repository: {query.slug}\nFiles: {root_node.file_count}\nDirectories: {root_node.dir_count}"
+
+    # Check for empty repository
+    if root_node.file_count == 0 and root_node.dir_count == 0:
+        summary += "\nNote: Repository appears to be empty"
+
+    repo_info = {
+        "id": query.id,
+        "url": query.url,
+        "slug": query.slug,
+        "user_name": query.user_name,
+        "repo_name": query.repo_name,
+        "total_files": root_node.file_count,
+        "total_dirs": root_node.dir_count,
+    }
+    return summary, repo_info
+
+
+def _iter_tree_data(
+    root_node: FileSystemNode,
+    include_content: bool,
+    summary: str,
+    repo_info: Dict[str, Any],
+) -> Iterator[bytes]:
+    """
+    Yield the tree data response for the nested layout, encoding the tree as it goes.
+    """
+    warnings: List[str] = []
+    yield b'{"success":true,"data":'
+    yield from _iter_filesystem_node_json(root_node, include_content=include_content, warnings=warnings)
+    yield (
+        b',"warnings":'
+        + orjson.dumps(warnings)
+        + b',"summary":'
+        + orjson.dumps(summary)
+        + b',"repo_info":'
+        + orjson.dumps(repo_info)
+        + b"}"
+    )
+
+
+async def _stream_and_keep(
+    chunks: Iterator[bytes],
+    encoding_key: Optional[Tuple[Any, ...]],
+    prefetched: List[FileSystemNode],
+) -> AsyncIterator[bytes]:
+    """
+    Produce ``chunks`` in a worker thread, storing the complete payload under ``encoding_key`` once it is sent.
+
+    The contents read ahead into ``prefetched`` are released once the stream ends, even if it is cut short.
+    """
+    parts: List[bytes] = []
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            if encoding_key is not None:
+                parts.append(chunk)
+            yield chunk
+    finally:
+        _release_contents(prefetched)
+
+    if encoding_key is not None:
+        _keep_encoding(encoding_key, b"".join(parts))
+
+
+def _keep_encoding(encoding_key: Tuple[Any, ...], payload: bytes) -> None:
+    """
+    Store an encoded tree data response, unless it alone exceeds the cache's byte budget.
+    """
+    if len(payload) <= _ENCODED_TREE_DATA_CACHE.maxsize:
+        _ENCODED_TREE_DATA_CACHE[encoding_key] = payload
@@ -1,11 +1,25 @@
 """Configuration for the server."""
 
+import os
 from typing import Dict, List
 
 from fastapi.templating import Jinja2Templates
 
 MAX_DISPLAY_SIZE: int = 300_000
 DELETE_REPO_AFTER: int = 60 * 60  # In seconds
+TREE_DATA_CACHE_SIZE: int = 2_000_000  # Nodes of walked trees the tree explorer keeps in memory
+ENCODED_TREE_DATA_CACHE_SIZE: int = 256 * 1024 * 1024  # Bytes of encoded tree explorer responses kept in memory
+TREE_DATA_CACHE_TTL: int = 5 * 60  # In seconds
+PARSED_QUERY_CACHE_SIZE: int = 256  # Number of parsed tree explorer queries kept in memory
+PARSED_QUERY_CACHE_TTL: int = 60  # In seconds
+CLONE_CONCURRENCY: int = int(os.getenv("CLONE_CONCURRENCY", "4"))  # Clones and walks run by the tree explorer at once
+MAX_TREE_NODES: int = 50_000  # Maximum number of nodes sent by the tree explorer
+MAX_TREE_DEPTH: int = 20  # Maximum directory depth expanded by the tree explorer
+WALKED_FILES_CACHE_SIZE: int = 1_000_000  # File paths remembered for the tree explorer's /api/file-content
+TREE_DATA_CHUNK_SIZE: int = 64 * 1024  # Size of the chunks the tree data is streamed in, in bytes
+MAX_CONTENT_PREVIEW_SIZE: int = 256 * 1024  # Files larger than this have their content left out by the tree explorer
+CONTENT_PREFETCH_CONCURRENCY: int = 32  # Files read at once when the tree explorer prefetches contents
+MAX_PREFETCH_SIZE: int = 32 * 1024 * 1024  # Bytes of file content the tree explorer reads ahead per response
 
 
 EXAMPLE_REPOS: List[Dict[str, str]] = [
@@ -1,14 +1,17 @@
 """Utility functions for the server."""
 
 import asyncio
+import functools
 import math
 import shutil
 import time
+from collections import deque
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Tuple
 
 from fastapi import FastAPI, Request
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
@@ -19,6 +22,110 @@ from server.server_config import DELETE_REPO_AFTER
 # Initialize a rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
+# Length of each period accepted in rate limit strings, in seconds
+_RATE_LIMIT_PERIODS: Dict[str, float] = {"second": 1, "minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60}
+
+
+class SlidingWindowLimiter:
+    """
+    In-memory sliding-window rate limiter, keyed by client address and endpoint.
+
+    Each decorated endpoint keeps a deque of request timestamps per client. A request is rejected
+    when the client already made the allowed number of requests within the last period. The
+    windows are only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self) -> None:
+        # One (period, timestamps by client) pair per decorated endpoint
+        self._windows: List[Tuple[float, Dict[str, Deque[float]]]] = []
+
+    def limit(self, limit_value: str) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+        """
+        Decorate an endpoint so that each client may call it at most ``limit_value`` times.
+
+        Parameters
+        ----------
+        limit_value : str
+            The rate limit, such as "5/minute". The endpoint must take a ``request`` argument.
+
+        Returns
+        -------
+        Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]
+            The decorator to apply to the endpoint.
+        """
+        max_requests, period = _parse_rate_limit(limit_value)
+        hits_by_client: Dict[str, Deque[float]] = {}
+        self._windows.append((period, hits_by_client))
+
+        def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+            @functools.wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                now = time.monotonic()
+                client = get_remote_address(kwargs["request"])
+                hits = hits_by_client.get(client)
+                if hits is None:
+                    hits = hits_by_client[client] = deque()
+
+                # Drop the timestamps that have slid out of the window
+                cutoff = now - period
+                while hits and hits[0] <= cutoff:
+                    hits.popleft()
+
+                if len(hits) >= max_requests:
+                    return JSONResponse({"error": f"Rate limit exceeded: {limit_value}"}, status_code=429)
+                hits.append(now)
+                return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def evict_idle(self) -> None:
+        """
+        Forget the clients that made no request within the period of an endpoint.
+        """
+        now = time.monotonic()
+        for period, hits_by_client in self._windows:
+            cutoff = now - period
+            for client in [client for client, hits in hits_by_client.items() if not hits or hits[-1] <= cutoff]:
+                del hits_by_client[client]
+
+    def reset(self) -> None:
+        """
+        Forget all recorded requests.
+        """
+        for _, hits_by_client in self._windows:
+            hits_by_client.clear()
+
+
+def _parse_rate_limit(limit_value: str) -> Tuple[int, float]:
+    """
+    Parse a rate limit string such as "5/minute" into a request count and a period in seconds.
+
+    Parameters
+    ----------
+    limit_value : str
+        The rate limit, as "<count>/<second|minute|hour|day>".
+
+    Returns
+    -------
+    Tuple[int, float]
+        The number of requests allowed per period, and the period in seconds.
+
+    Raises
+    ------
+    ValueError
+        If the rate limit string is malformed.
+    """
+    count, _, period_name = limit_value.partition("/")
+    if not count.strip().isdigit() or period_name.strip() not in _RATE_LIMIT_PERIODS:
+        raise ValueError(f"Invalid rate limit: {limit_value!r}")
+    return int(count), _RATE_LIMIT_PERIODS[period_name.strip()]
+
+
+# Sliding-window limiter for endpoints whose requests are expensive, such as cloning a repository
+sliding_window_limiter = SlidingWindowLimiter()
+
 
 async def rate_limit_exception_handler(request: Request, exc: Exception) -> Response:
     """
@@ -61,17 +168,33 @@ async def lifespan(_: FastAPI):
     Yields
     -------
     None
-        Yields control back to the FastAPI application while the background task runs.
+        Yields control back to the FastAPI application while the background tasks run.
     """
-    task = asyncio.create_task(_remove_old_repositories())
+    tasks = [
+        asyncio.create_task(_remove_old_repositories()),
+        asyncio.create_task(_evict_idle_rate_limit_clients()),
+    ]
 
     yield
-    # Cancel the background task on shutdown
-    task.cancel()
-    try:
-        await task
-    except asyncio.CancelledError:
-        pass
+    # Cancel the background tasks on shutdown
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def _evict_idle_rate_limit_clients():
+    """
+    Periodically drop the sliding-window limiter's state for clients that have gone idle.
+
+    This keeps the limiter's memory proportional to the number of recently active clients.
+    """
+    while True:
+        await asyncio.sleep(60)
+        sliding_window_limiter.evict_idle()
 
 
 async def _remove_old_repositories():
@@ -0,0 +1,494 @@
+"""Serialize the file structure walked by the tree explorer into its JSON layouts."""
+
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import orjson
+
+from gitingest.schemas import FileSystemNode, FileSystemNodeType
+from server.server_config import MAX_CONTENT_PREVIEW_SIZE, MAX_TREE_DEPTH, MAX_TREE_NODES, TREE_DATA_CHUNK_SIZE
+
+# Serialized name of each node type
+_TYPE_NAMES = {node_type: node_type.name.lower() for node_type in FileSystemNodeType}
+
+# Extensions of binary and generated files whose content the tree explorer does not read
+_ELIDED_CONTENT_EXTENSIONS = frozenset(
+    {
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".pdf",
+        ".zip",
+        ".gz",
+        ".tar",
+        ".woff",
+        ".woff2",
+        ".ico",
+        ".so",
+        ".o",
+        ".exe",
+        ".dll",
+        ".class",
+        ".jar",
+        ".pyc",
+        ".map",
+    }
+)
+# Multi-part suffixes that ``_extension_from_name`` cannot see, such as minified bundles
+_ELIDED_CONTENT_SUFFIXES = (".min.js",)
+
+
+def _filesystem_node_to_json(
+    node: FileSystemNode,
+    include_content: bool = True,
+    max_nodes: int = MAX_TREE_NODES,
+    max_depth: int = MAX_TREE_DEPTH,
+    warnings: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Convert a FileSystemNode to a JSON-serializable dictionary.
+
+    For files, includes content (unless ``include_content`` is False). For directories, includes children.
+    Each node has metadata like type, size, extension, etc. Binary, minified and oversized files get
+    ``"content": None`` and ``"content_elided": True`` instead of their content.
+
+    The tree is walked iteratively with an explicit stack, so deep repositories
+    do not hit the recursion limit. At most ``max_nodes`` nodes are included, and directories
+    ``max_depth`` levels below ``node`` are not expanded; directories missing some of their
+    children get ``"truncated": True``, and an explanation is appended to ``warnings``.
+    ``max_nodes`` must be at least 1, since the root is always included.
+    """
+    _check_node_budget(max_nodes)
+    # Holds the root as its only child, so every node has a parent dict to be appended to
+    holder: Dict[str, Any] = {"children": []}
+    # Each entry pairs a node with its parent's dict
+    stack: List[Tuple[FileSystemNode, Dict[str, Any]]] = [(node, holder)]
+    depth_limit = node.depth + max_depth
+    node_count = 0
+    nodes_truncated = depth_truncated = False
+
+    # Bind names used for every node to locals, which are cheaper to look up than globals and attributes
+    file_type = FileSystemNodeType.FILE
+    directory_type = FileSystemNodeType.DIRECTORY
+    type_names = _TYPE_NAMES
+    extension_from_name = _extension_from_name
+    content_is_elided = _content_is_elided
+    stack_pop = stack.pop
+    stack_extend = stack.extend
+
+    while stack:
+        current, parent = stack_pop()
+        if node_count == max_nodes:
+            # Out of budget: drop the nodes left on the stack and flag the directories they belong to
+            parent["truncated"] = True
+            for _, parent in stack:
+                parent["truncated"] = True
+            nodes_truncated = True
+            break
+        node_count += 1
+
+        name = current.name
+        node_type = current.type
+        result = {
+            "name": name,
+            "type": type_names[node_type],
+            "path": current.path_str,
+            "size": current.size,
+            "depth": current.depth,
+            "file_count": current.file_count,
+            "dir_count": current.dir_count,
+        }
+
+        if node_type is file_type:
+            # For files, add content and extension
+            extension = extension_from_name(name)
+            if include_content:
+                if content_is_elided(name, extension, current.size):
+                    result["content"] = None
+                    result["content_elided"] = True
+                else:
+                    result["content"] = current.content
+            result["extension"] = extension
+        elif node_type is directory_type:
+            # For directories, push children in reverse so they are emitted in their original order
+            result["children"] = []
+            if current.depth < depth_limit:
+                stack_extend((child, result) for child in reversed(current.children))
+            elif current.children:
+                result["truncated"] = depth_truncated = True
+
+        parent["children"].append(result)
+
+    if warnings is not None:
+        warnings.extend(_truncation_warnings(nodes_truncated, depth_truncated, max_nodes, max_depth))
+    return holder["children"][0]
+
+
+def _filesystem_node_to_columns(
+    node: FileSystemNode,
+    include_content: bool = True,
+    max_nodes: int = MAX_TREE_NODES,
+    max_depth: int = MAX_TREE_DEPTH,
+    warnings: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Convert a FileSystemNode tree to a column-oriented (struct-of-arrays) dictionary.
+
+    Nodes are numbered in depth-first pre-order and each attribute is stored in its own list,
+    indexed by node id. ``parents`` holds the id of each node's parent (-1 for the root), and the
+    children of node ``i`` are ``child_ids[children_offsets[i]:children_offsets[i + 1]]``.
+    Directories and symlinks have an empty extension and no content; ``contents`` and ``content_elided``
+    are left out entirely when ``include_content`` is False. ``content_elided`` lists the ids of files
+    whose content is not read (see ``_content_is_elided``). The tree is bounded as in ``_filesystem_node_to_json``,
+    and ``truncated`` lists the ids of directories missing some of their children.
+    """
+    _check_node_budget(max_nodes)
+    # One row per node, transposed into columns at the end
+    rows: List[Tuple[str, str, str, int, int, int, int, str, Optional[str], int]] = []
+    content_elided: List[int] = []
+    truncated: Set[int] = set()
+
+    stack: List[Tuple[FileSystemNode, int]] = [(node, -1)]
+    depth_limit = node.depth + max_depth
+    nodes_truncated = depth_truncated = False
+
+    # Bind names used for every node to locals, which are cheaper to look up than globals and attributes
+    file_type = FileSystemNodeType.FILE
+    directory_type = FileSystemNodeType.DIRECTORY
+    type_names = _TYPE_NAMES
+    extension_from_name = _extension_from_name
+    content_is_elided = _content_is_elided
+    stack_pop = stack.pop
+    stack_extend = stack.extend
+    add_row = rows.append
+    add_elided = content_elided.append
+
+    while stack:
+        current, parent_id = stack_pop()
+        node_id = len(rows)
+        if node_id == max_nodes:
+            # Out of budget: drop the nodes left on the stack and flag the directories they belong to
+            truncated.add(parent_id)
+            truncated.update(remaining_parent_id for _, remaining_parent_id in stack)
+            nodes_truncated = True
+            break
+
+        name = current.name
+        node_type = current.type
+        # Directories and symlinks have no extension or content
+        extension = ""
+        content = None
+
+        if node_type is file_type:
+            extension = extension_from_name(name)
+            if include_content:
+                if content_is_elided(name, extension, current.size):
+                    add_elided(node_id)
+                else:
+                    content = current.content
+        elif node_type is directory_type:
+            if current.depth < depth_limit:
+                stack_extend((child, node_id) for child in reversed(current.children))
+            elif current.children:
+                truncated.add(node_id)
+                depth_truncated = True
+
+        add_row(
+            (
+                name,
+                type_names[node_type],
+                current.path_str,
+                current.size,
+                current.depth,
+                current.file_count,
+                current.dir_count,
+                extension,
+                content,
+                parent_id,
+            )
+        )
+
+    # The root is always emitted, so there is at least one row to transpose
+    names, types, paths, sizes, depths, file_counts, dir_counts, extensions, contents, parents = (
+        list(column) for column in zip(*rows)
+    )
+    children_offsets, child_ids = _children_index(parents)
+
+    columns = {
+        "layout": "columns",
+        "names": names,
+        "types": types,
+        "paths": paths,
+        "sizes": sizes,
+        "depths": depths,
+        "file_counts": file_counts,
+        "dir_counts": dir_counts,
+        "extensions": extensions,
+        "parents": parents,
+        "children_offsets": children_offsets,
+        "child_ids": child_ids,
+        "truncated": sorted(truncated),
+    }
+    if include_content:
+        columns["contents"] = contents
+        columns["content_elided"] = content_elided
+    if warnings is not None:
+        warnings.extend(_truncation_warnings(nodes_truncated, depth_truncated, max_nodes, max_depth))
+    return columns
+
+
+def _children_index(parents: List[int]) -> Tuple[List[int], List[int]]:
+    """
+    Return the CSR index of the children of each node, given the parent id of each node (-1 for the root).
+
+    The children of node ``i`` are ``child_ids[children_offsets[i]:children_offsets[i + 1]]``; pre-order
+    numbering keeps siblings in their original order.
+    """
+    children_offsets = [0] * (len(parents) + 1)
+    for parent_id in parents:
+        if parent_id >= 0:
+            children_offsets[parent_id + 1] += 1
+    for i in range(len(parents)):
+        children_offsets[i + 1] += children_offsets[i]
+
+    child_ids = [0] * (len(parents) - 1) if parents else []
+    next_slot = children_offsets[:-1]
+    for child_id, parent_id in enumerate(parents):
+        if parent_id >= 0:
+            child_ids[next_slot[parent_id]] = child_id
+            next_slot[parent_id] += 1
+    return children_offsets, child_ids
+
+
+def _filesystem_node_to_flat(
+    node: FileSystemNode,
+    include_content: bool = True,
+    max_nodes: int = MAX_TREE_NODES,
+    max_depth: int = MAX_TREE_DEPTH,
+    warnings: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Convert a FileSystemNode tree to a flat list of nodes linked by parent index.
+
+    Nodes are numbered in breadth-first order; ``parents`` holds the index of each node's parent
+    (-1 for the root). Node dicts carry the same fields as in ``_filesystem_node_to_json`` except
+    ``children`` and ``depth``, which the client derives from ``parents``. The tree is bounded as in
+    ``_filesystem_node_to_json``; since nodes are taken level by level, the node budget drops the
+    deepest nodes first.
+    """
+    _check_node_budget(max_nodes)
+    nodes: List[Dict[str, Any]] = []
+    parents: List[int] = []
+    queue: Deque[Tuple[FileSystemNode, int]] = deque([(node, -1)])
+    depth_limit = node.depth + max_depth
+    nodes_truncated = depth_truncated = False
+
+    # Bind names used for every node to locals, which are cheaper to look up than globals and attributes
+    file_type = FileSystemNodeType.FILE
+    directory_type = FileSystemNodeType.DIRECTORY
+    type_names = _TYPE_NAMES
+    extension_from_name = _extension_from_name
+    content_is_elided = _content_is_elided
+    queue_popleft = queue.popleft
+    queue_extend = queue.extend
+    add_node = nodes.append
+    add_parent = parents.append
+
+    while queue:
+        current, parent_id = queue_popleft()
+        node_id = len(nodes)
+        if node_id == max_nodes:
+            # Out of budget: drop the nodes left in the queue and flag the directories they belong to
+            nodes[parent_id]["truncated"] = True
+            for _, remaining_parent_id in queue:
+                nodes[remaining_parent_id]["truncated"] = True
+            nodes_truncated = True
+            break
+
+        name = current.name
+        node_type = current.type
+        result: Dict[str, Any] = {
+            "name": name,
+            "type": type_names[node_type],
+            "path": current.path_str,
+            "size": current.size,
+            "file_count": current.file_count,
+            "dir_count": current.dir_count,
+        }
+
+        if node_type is file_type:
+            extension = extension_from_name(name)
+            if include_content:
+                if content_is_elided(name, extension, current.size):
+                    result["content"] = None
+                    result["content_elided"] = True
+                else:
+                    result["content"] = current.content
+            result["extension"] = extension
+        elif node_type is directory_type:
+            if current.depth < depth_limit:
+                queue_extend((child, node_id) for child in current.children)
+            elif current.children:
+                result["truncated"] = depth_truncated = True
+
+        add_node(result)
+        add_parent(parent_id)
+
+    if warnings is not None:
+        warnings.extend(_truncation_warnings(nodes_truncated, depth_truncated, max_nodes, max_depth))
+    return {"layout": "flat", "nodes": nodes, "parents": parents}
+
+
+def _iter_filesystem_node_json(
+    node: FileSystemNode,
+    include_content: bool = True,
+    max_nodes: int = MAX_TREE_NODES,
+    max_depth: int = MAX_TREE_DEPTH,
+    warnings: Optional[List[str]] = None,
+    chunk_size: int = TREE_DATA_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Encode a FileSystemNode tree as JSON incrementally, yielding chunks of about ``chunk_size`` bytes.
+
+    Produces the same document as ``orjson.dumps(_filesystem_node_to_json(node, ...))`` without building
+    the intermediate dictionaries, so memory use depends on the depth of the tree rather than its size.
+    ``warnings`` is only complete once the iterator is exhausted.
+    """
+    _check_node_budget(max_nodes)
+    buffer = bytearray()
+    # Entries are either a node, paired with whether it follows a sibling, or the bytes closing a directory
+    stack: List[Union[Tuple[FileSystemNode, bool], bytes]] = [(node, False)]
+    depth_limit = node.depth + max_depth
+    node_count = 0
+    # Once the node budget is spent, remaining nodes are skipped and the next closing bytes popped
+    # belong to their parent directory, which is then flagged as truncated
+    nodes_truncated = depth_truncated = skipped_children = False
+
+    # Bind names used for every node to locals, which are cheaper to look up than globals and attributes
+    file_type = FileSystemNodeType.FILE
+    directory_type = FileSystemNodeType.DIRECTORY
+    type_names = _TYPE_NAMES
+    file_fields_json = _file_fields_json
+    dumps = orjson.dumps
+    stack_pop = stack.pop
+    stack_push = stack.append
+    stack_extend = stack.extend
+
+    while stack:
+        entry = stack_pop()
+        if entry.__class__ is bytes:
+            buffer += b'],"truncated":true}' if skipped_children else entry
+            skipped_children = False
+            continue
+
+        if node_count == max_nodes:
+            nodes_truncated = skipped_children = True
+            continue
+        node_count += 1
+
+        current, follows_sibling = entry
+        node_type = current.type
+        if follows_sibling:
+            buffer += b","
+
+        # Encode the common fields in one call, then reopen the object to append the rest
+        buffer += dumps(
+            {
+                "name": current.name,
+                "type": type_names[node_type],
+                "path": current.path_str,
+                "size": current.size,
+                "depth": current.depth,
+                "file_count": current.file_count,
+                "dir_count": current.dir_count,
+            }
+        )[:-1]
+
+        if node_type is file_type:
+            buffer += file_fields_json(current, include_content)
+        elif node_type is directory_type:
+            children = current.children
+            if current.depth < depth_limit:
+                buffer += b',"children":['
+                stack_push(b"]}")
+                stack_extend((children[i], i > 0) for i in range(len(children) - 1, -1, -1))
+            else:
+                # Directories past the depth limit are sent without their children
+                buffer += b',"children":[],"truncated":true}' if children else b',"children":[]}'
+                depth_truncated = depth_truncated or bool(children)
+        else:
+            buffer += b"}"
+
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if buffer:
+        yield bytes(buffer)
+
+    if warnings is not None:
+        warnings.extend(_truncation_warnings(nodes_truncated, depth_truncated, max_nodes, max_depth))
+
+
+def _file_fields_json(node: FileSystemNode, include_content: bool) -> bytes:
+    """
+    Return the fields that close a file object in ``_iter_filesystem_node_json``: its content, if requested, and
+    its extension.
+    """
+    name = node.name
+    extension = _extension_from_name(name)
+    extension_json = b',"extension":' + orjson.dumps(extension) + b"}"
+    if not include_content:
+        return extension_json
+    if _content_is_elided(name, extension, node.size):
+        return b',"content":null,"content_elided":true' + extension_json
+    return b',"content":' + orjson.dumps(node.content) + extension_json
+
+
+def _check_node_budget(max_nodes: int) -> None:
+    """
+    Raise a ValueError unless ``max_nodes`` leaves room for the root node.
+    """
+    if max_nodes < 1:
+        raise ValueError(f"max_nodes must be at least 1, got {max_nodes}")
+
+
+def _truncation_warnings(nodes_truncated: bool, depth_truncated: bool, max_nodes: int, max_depth: int) -> List[str]:
+    """
+    Return the messages explaining why a serialized tree is incomplete.
+    """
+    messages = []
+    if nodes_truncated:
+        messages.append(
+            f"The repository has more than {max_nodes} files and directories; only the first {max_nodes} are shown"
+        )
+    if depth_truncated:
+        messages.append(f"Directories nested more than {max_depth} levels deep are not expanded")
+    return messages
+
+
+def _extension_from_name(name: str) -> str:
+    """
+    Return the lowercased extension of a file name, or an empty string if it has none.
+
+    The extension is sliced off the name rather than going through ``PurePath.suffix``;
+    a leading dot (".hidden") or a trailing one ("file.") means no extension, as in pathlib.
+    """
+    dot = name.rfind(".")
+    return name[dot:].lower() if 0 < dot < len(name) - 1 else ""
+
+
+def _content_is_elided(name: str, extension: str, size: int) -> bool:
+    """
+    Return whether the content of a file is left out of the tree explorer's responses.
+
+    Binary assets, minified bundles and files larger than ``MAX_CONTENT_PREVIEW_SIZE`` are not shown
+    by the explorer, so their content is not read at all. ``extension`` is the result of
+    ``_extension_from_name(name)``.
+    """
+    return (
+        size > MAX_CONTENT_PREVIEW_SIZE
+        or extension in _ELIDED_CONTENT_EXTENSIONS
+        or name.lower().endswith(_ELIDED_CONTENT_SUFFIXES)
+    )
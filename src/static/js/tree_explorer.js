@@ -6,6 +6,8 @@
 class TreeExplorer {
     constructor() {
         this.data = null;
+        this.repoInfo = null;
+        this.fileContents = new Map();
         this.svg = null;
         this.g = null;
         this.tree = null;
@@ -122,6 +124,7 @@ class TreeExplorer {
     
     async handleFormSubmit() {
         const formData = new FormData(document.getElementById('treeForm'));
+        formData.append('layout', 'columns');
         const repoUrl = formData.get('repo_url');
         const token = formData.get('token');
         
@@ -142,16 +145,18 @@ class TreeExplorer {
             const result = await response.json();
             
             if (result.success) {
-                this.data = result.data;
+                this.data = this.buildTreeData(result.data);
+                this.repoInfo = result.repo_info;
+                this.fileContents.clear();
                 
                 // Check if repository is empty
-                if (!result.data.children || result.data.children.length === 0) {
+                if (!this.data.children || this.data.children.length === 0) {
                     this.showError('Repository appears to be empty or has no accessible files');
                     return;
                 }
                 
                 this.setupTree();
-                this.showRepoInfo(result.repo_info);
+                this.showRepoInfo(result.repo_info, result.warnings || []);
                 document.getElementById('controls').classList.remove('hidden');
                 document.getElementById('infoPanel').classList.remove('hidden');
             } else {
@@ -164,6 +169,37 @@ class TreeExplorer {
         }
     }
     
+    buildTreeData(data) {
+        if (data.layout !== 'columns') {
+            return data;
+        }
+        
+        // Rebuild the nested shape from the column arrays, linking nodes through their parent ids
+        const rows = data.names.map((name, i) => ({
+            id: i,
+            parent: data.parents[i],
+            name: name,
+            type: data.types[i],
+            path: data.paths[i],
+            size: data.sizes[i],
+            depth: data.depths[i],
+            file_count: data.file_counts[i],
+            dir_count: data.dir_counts[i],
+            extension: data.extensions[i],
+            content: data.contents ? data.contents[i] : undefined
+        }));
+        const root = d3.stratify()
+            .id(d => d.id)
+            .parentId(d => d.parent === -1 ? null : d.parent)(rows);
+        
+        root.each(node => {
+            if (node.data.type === 'directory') {
+                node.data.children = (node.children || []).map(child => child.data);
+            }
+        });
+        return root.data;
+    }
+    
     setupTree() {
         // Clear existing tree
         this.g.selectAll('*').remove();
@@ -305,6 +341,9 @@ class TreeExplorer {
         
         // Update current node info
         this.showNodeInfo(d.data);
+        if (d.data.type === 'file') {
+            this.showFileContent(d.data);
+        }
         
         this.update(d);
     }
@@ -382,16 +421,25 @@ class TreeExplorer {
         this.handleSearch('');
     }
     
-    showRepoInfo(repoInfo) {
+    showRepoInfo(repoInfo, warnings) {
         const repoDetails = document.getElementById('repoDetails');
         repoDetails.innerHTML = `
             <div><strong>Repository:</strong> ${repoInfo.slug}</div>
             <div><strong>Files:</strong> ${repoInfo.total_files}</div>
             <div><strong>Directories:</strong> ${repoInfo.total_dirs}</div>
         `;
+        
+        // The tree may have been cut short; say so rather than silently showing part of it
+        warnings.forEach(warning => {
+            const warningElement = document.createElement('div');
+            warningElement.className = 'text-yellow-700';
+            warningElement.textContent = warning;
+            repoDetails.appendChild(warningElement);
+        });
     }
     
     showNodeInfo(nodeData) {
+        this.currentNode = nodeData;
         const nodeInfo = document.getElementById('nodeInfo');
         const nodeDetails = document.getElementById('nodeDetails');
         
@@ -406,6 +454,36 @@ class TreeExplorer {
         nodeInfo.classList.remove('hidden');
     }
     
+    async showFileContent(nodeData) {
+        // File contents are not part of the tree data; fetch them on demand and keep them around
+        if (!this.fileContents.has(nodeData.path)) {
+            const params = new URLSearchParams({
+                repo_id: this.repoInfo.id,
+                slug: this.repoInfo.slug,
+                path: nodeData.path
+            });
+            this.fileContents.set(nodeData.path, fetch(`/api/file-content?${params}`)
+                .then(response => response.ok ? response.json() : null)
+                .catch(() => null));
+        }
+        
+        const result = await this.fileContents.get(nodeData.path);
+        if (result === null) {
+            // Allow a later click to retry
+            this.fileContents.delete(nodeData.path);
+            return;
+        }
+        if (this.currentNode !== nodeData) {
+            return;
+        }
+        
+        const preview = document.createElement('pre');
+        preview.className = 'file-content';
+        // Binary, minified and oversized files are not read by the server
+        preview.textContent = result.content_elided ? 'Preview not available for this file' : result.content;
+        document.getElementById('nodeDetails').appendChild(preview);
+    }
+    
     formatBytes(bytes) {
         if (bytes === 0) return '0 Bytes';
         const k = 1024;
@@ -1,17 +1,32 @@
 """Tests for the tree explorer feature."""
 
+import asyncio
 import json
 import os
+import threading
+import weakref
 from pathlib import Path
+from typing import List
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from cachetools import TTLCache
 from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
 
-from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats, IngestionQuery
 from server.main import app
-from server.routers.tree_explorer import _filesystem_node_to_json
+from server.routers.tree_explorer import (
+    _ENCODED_TREE_DATA_CACHE,
+    _PARSED_QUERY_CACHE,
+    _TREE_DATA_CACHE,
+    _WALKED_FILES,
+    _prefetch_contents,
+    _tree_data_response,
+    _walk_repository,
+)
+from server.server_utils import SlidingWindowLimiter, sliding_window_limiter
+from server.tree_serialization import _filesystem_node_to_json
 
 
 @pytest.fixture
@@ -68,6 +83,22 @@ def sample_dir_node():
     return dir_node
 
 
+@pytest.fixture
+async def walked_repository(tmp_path: Path, mocker: MockerFixture):
+    """Walk a small repository with a binary file and files in two directories."""
+
+    async def fake_clone_repo(config, token=None):
+        for directory, file_name in (("a", "x.py"), ("b", "y.py")):
+            (tmp_path / directory).mkdir()
+            (tmp_path / directory / file_name).write_text(f"# {file_name}\n")
+        (tmp_path / "README.md").write_text("# Title\n")
+        (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n")
+
+    mocker.patch("server.routers.tree_explorer.clone_repo", AsyncMock(side_effect=fake_clone_repo))
+    query = IngestionQuery(url="https://github.com/user/repo", local_path=tmp_path, slug="user-repo", id="id")
+    return await _walk_repository(query, token=None)
+
+
 class TestFileSystemNodeToJson:
     """Test the filesystem node to JSON conversion."""
 
@@ -453,4 +484,575 @@ class TestTreeExplorerErrorHandling:
         if response.headers.get("content-type") == "application/json":
             data = response.json()
             assert "error" in data
-            assert "credentials" in data["error"].lower()
\ No newline at end of file
+            assert "credentials" in data["error"].lower()
+
+
+class TestTreeDataCache:
+    """Test caching of tree data responses."""
+
+    @pytest.fixture(autouse=True)
+    def reset_tree_data_state(self):
+        """Start every test with empty caches and a fresh rate limit."""
+        _TREE_DATA_CACHE.clear()
+        _ENCODED_TREE_DATA_CACHE.clear()
+        _PARSED_QUERY_CACHE.clear()
+        sliding_window_limiter.reset()
+        yield
+        _TREE_DATA_CACHE.clear()
+        _ENCODED_TREE_DATA_CACHE.clear()
+        _PARSED_QUERY_CACHE.clear()
+
+    @pytest.fixture
+    def client(self):
+        """Create a test client on a host accepted by the default allowed hosts."""
+        return TestClient(app, base_url="http://localhost")
+
+    @pytest.fixture
+    def repo_query(self, tmp_path: Path, mocker: MockerFixture) -> IngestionQuery:
+        """Create a query for a repository cloned under a temporary base path."""
+        mocker.patch("server.routers.tree_explorer.TMP_BASE_PATH", tmp_path)
+        return IngestionQuery(
+            user_name="user",
+            repo_name="repo",
+            url="https://github.com/user/repo",
+            local_path=tmp_path / "id" / "user-repo",
+            slug="user-repo",
+            id="id",
+            branch="main",
+        )
+
+    @pytest.fixture
+    def mock_clone_repo(self, mocker: MockerFixture) -> AsyncMock:
+        """Replace ``clone_repo`` with a stand-in that writes a small repository to the clone directory."""
+
+        async def fake_clone_repo(config, token=None):
+            (Path(config.local_path) / "src").mkdir(parents=True, exist_ok=True)
+            (Path(config.local_path) / "src" / "main.py").write_text("print('hello')\n")
+
+        return mocker.patch("server.routers.tree_explorer.clone_repo", AsyncMock(side_effect=fake_clone_repo))
+
+    def test_repeated_requests_are_served_from_cache(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that a second request for the same repository does not clone it again."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+
+        first = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+        second = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert first.content == second.content
+        assert first.json()["repo_info"]["total_files"] == 1
+        mock_clone_repo.assert_awaited_once()
+
+    def test_requests_with_token_are_not_cached(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that responses for authenticated requests are never stored."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+
+        for _ in range(2):
+            response = client.post(
+                "/api/tree-data",
+                data={"repo_url": "https://github.com/user/repo", "token": "github_pat_test"},
+            )
+            assert response.status_code == 200
+
+        assert mock_clone_repo.await_count == 2
+        assert len(_TREE_DATA_CACHE) == 0
+
+    def test_parsed_queries_are_reused_with_a_fresh_clone_directory(
+        self, client, mocker: MockerFixture, repo_query, mock_clone_repo
+    ):
+        """Test that a repeated URL is parsed once but cloned into a new directory."""
+        mock_parse_query = mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+
+        client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+        # Force a second clone while the parsed query is still cached
+        _TREE_DATA_CACHE.clear()
+        response = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+
+        mock_parse_query.assert_awaited_once()
+        assert mock_clone_repo.await_count == 2
+        first_config, second_config = (call.args[0] for call in mock_clone_repo.await_args_list)
+        assert first_config.local_path == str(repo_query.local_path)
+        assert second_config.local_path != first_config.local_path
+        assert response.json()["repo_info"]["id"] != "id"
+
+    def test_layouts_share_one_walk(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that each layout is encoded separately from a single clone and walk."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+
+        nested = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+        columns = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo", "layout": "columns"})
+        columns_again = client.post(
+            "/api/tree-data",
+            data={"repo_url": "https://github.com/user/repo", "layout": "columns"},
+        )
+
+        assert nested.json()["data"]["children"][0]["name"] == "src"
+        assert columns.json()["data"]["names"] == ["user-repo", "src", "main.py"]
+        assert columns.json()["data"]["parents"] == [-1, 0, 1]
+        assert columns_again.content == columns.content
+        mock_clone_repo.assert_awaited_once()
+
+    def test_caches_are_weighted_by_size(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that walks count by their nodes and encoded responses by their bytes."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+
+        nested = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+        columns = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo", "layout": "columns"})
+
+        assert _TREE_DATA_CACHE.currsize == 3
+        assert _ENCODED_TREE_DATA_CACHE.currsize == len(nested.content) + len(columns.content)
+
+    def test_oversized_entries_are_not_cached(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that a walk or an encoding larger than its cache's budget is served without being kept."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+        mocker.patch(
+            "server.routers.tree_explorer._TREE_DATA_CACHE",
+            TTLCache(maxsize=2, ttl=60, getsizeof=_TREE_DATA_CACHE.getsizeof),
+        )
+        mocker.patch(
+            "server.routers.tree_explorer._ENCODED_TREE_DATA_CACHE",
+            TTLCache(maxsize=10, ttl=60, getsizeof=len),
+        )
+
+        for _ in range(2):
+            response = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+            assert response.status_code == 200
+            assert response.json()["repo_info"]["total_files"] == 1
+
+        assert mock_clone_repo.await_count == 2
+
+    def test_subpaths_are_cached_separately(self, client, mocker: MockerFixture, repo_query):
+        """Test that two subpaths of the same repository and branch get their own trees."""
+        queries = {
+            "https://github.com/user/repo/tree/main/src": repo_query.model_copy(update={"subpath": "/src"}),
+            "https://github.com/user/repo/tree/main/docs": repo_query.model_copy(update={"subpath": "/docs"}),
+        }
+        mocker.patch(
+            "server.routers.tree_explorer.parse_query",
+            AsyncMock(side_effect=lambda repo_url, **kwargs: queries[repo_url]),
+        )
+
+        async def fake_clone_repo(config, token=None):
+            for subpath, file_name in (("src", "a.py"), ("docs", "b.md")):
+                (Path(config.local_path) / subpath).mkdir(parents=True, exist_ok=True)
+                (Path(config.local_path) / subpath / file_name).write_text("x\n")
+
+        mocker.patch("server.routers.tree_explorer.clone_repo", AsyncMock(side_effect=fake_clone_repo))
+
+        trees = [client.post("/api/tree-data", data={"repo_url": url}).json()["data"] for url in queries]
+
+        assert [tree["name"] for tree in trees] == ["src", "docs"]
+        assert [[child["name"] for child in tree["children"]] for tree in trees] == [["a.py"], ["b.md"]]
+
+    def test_flat_layout(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test requesting the tree as a flat list of nodes."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+
+        response = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo", "layout": "flat"})
+
+        data = response.json()["data"]
+        assert data["layout"] == "flat"
+        assert [node["path"] for node in data["nodes"]] == [".", "src", "src/main.py"]
+        assert data["parents"] == [-1, 0, 1]
+
+    @pytest.mark.parametrize("layout", ["nested", "columns"])
+    def test_matching_etag_returns_not_modified(
+        self, client, mocker: MockerFixture, repo_query, mock_clone_repo, layout
+    ):
+        """Test that a request carrying the ETag of the cached tree gets an empty 304 response."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+        mocker.patch("server.routers.tree_explorer.run_command", AsyncMock(return_value=(b"abc123\n", b"")))
+        data = {"repo_url": "https://github.com/user/repo", "layout": layout}
+
+        first = client.post("/api/tree-data", data=data)
+        etag = first.headers["etag"]
+        not_modified = client.post("/api/tree-data", data=data, headers={"If-None-Match": etag})
+        other_etag = client.post("/api/tree-data", data=data, headers={"If-None-Match": 'W/"other"'})
+
+        assert etag.startswith('W/"abc123-')
+        assert first.headers["cache-control"] == "private, max-age=300"
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+        assert other_etag.status_code == 200
+        assert other_etag.headers["etag"] == etag
+        assert other_etag.content == first.content
+        mock_clone_repo.assert_awaited_once()
+
+    def test_etag_depends_on_layout(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that different serializations of the same commit get different ETags."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+        mocker.patch("server.routers.tree_explorer.run_command", AsyncMock(return_value=(b"abc123\n", b"")))
+
+        nested = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+        columns = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo", "layout": "columns"})
+
+        assert nested.headers["etag"] != columns.headers["etag"]
+
+    def test_reclone_gets_a_new_etag(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that a tag from an expired clone does not revalidate a response pointing at a new clone."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+        mocker.patch("server.routers.tree_explorer.run_command", AsyncMock(return_value=(b"abc123\n", b"")))
+
+        first = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+        # Expire the walk; the next request re-clones into a new directory with a new id
+        _TREE_DATA_CACHE.clear()
+        second = client.post(
+            "/api/tree-data",
+            data={"repo_url": "https://github.com/user/repo"},
+            headers={"If-None-Match": first.headers["etag"]},
+        )
+
+        assert second.status_code == 200
+        assert second.json()["repo_info"]["id"] != first.json()["repo_info"]["id"]
+        assert second.headers["etag"] != first.headers["etag"]
+
+    def test_wildcard_if_none_match_is_ignored(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that ``If-None-Match: *`` does not turn the POST into a 304."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+        mocker.patch("server.routers.tree_explorer.run_command", AsyncMock(return_value=(b"abc123\n", b"")))
+
+        response = client.post(
+            "/api/tree-data",
+            data={"repo_url": "https://github.com/user/repo"},
+            headers={"If-None-Match": "*"},
+        )
+
+        assert response.status_code == 200
+        assert "etag" in response.headers
+
+    def test_no_etag_without_commit(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that responses are sent without caching headers when HEAD cannot be resolved."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+        mocker.patch("server.routers.tree_explorer.run_command", AsyncMock(side_effect=RuntimeError("not a repo")))
+
+        response = client.post(
+            "/api/tree-data",
+            data={"repo_url": "https://github.com/user/repo"},
+            headers={"If-None-Match": "*"},
+        )
+
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+
+    def test_unknown_layout_is_rejected(self, client, mocker: MockerFixture):
+        """Test that an unsupported layout returns an error."""
+        mock_parse_query = mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock())
+
+        response = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo", "layout": "xml"})
+
+        assert response.status_code == 400
+        assert "Unknown layout" in response.json()["error"]
+        mock_parse_query.assert_not_awaited()
+
+    def test_content_is_excluded_by_default(self, client, mocker: MockerFixture, repo_query, mock_clone_repo):
+        """Test that file contents are only sent when requested."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+
+        without_content = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+        with_content = client.post(
+            "/api/tree-data",
+            data={"repo_url": "https://github.com/user/repo", "include_content": "true"},
+        )
+
+        main_py = without_content.json()["data"]["children"][0]["children"][0]
+        assert main_py["name"] == "main.py"
+        assert "content" not in main_py
+        assert without_content.json()["repo_info"]["id"] == "id"
+        assert with_content.json()["data"]["children"][0]["children"][0]["content"] == "print('hello')\n"
+
+    @pytest.mark.parametrize(
+        "subpath, expected_name, expected_path",
+        [("/", "user-repo", "."), ("/src/", "src", "src")],
+    )
+    def test_root_node_paths(
+        self, client, mocker: MockerFixture, repo_query, mock_clone_repo, subpath, expected_name, expected_path
+    ):
+        """Test the name and relative path of the root node for the repository root and a subpath."""
+        repo_query.subpath = subpath
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(return_value=repo_query))
+
+        response = client.post("/api/tree-data", data={"repo_url": "https://github.com/user/repo"})
+
+        root = response.json()["data"]
+        assert root["name"] == expected_name
+        assert root["path"] == expected_path
+
+
+class TestFileContent:
+    """Test the on-demand file content endpoint."""
+
+    @pytest.fixture
+    def client(self):
+        """Create a test client on a host accepted by the default allowed hosts."""
+        return TestClient(app, base_url="http://localhost")
+
+    @pytest.fixture
+    def cloned_repo(self, tmp_path: Path, mocker: MockerFixture) -> Path:
+        """Create a fake cloned repository under a temporary base path."""
+        mocker.patch("server.routers.tree_explorer.TMP_BASE_PATH", tmp_path)
+        local_path = tmp_path / "repo-id" / "user-repo"
+        (local_path / "src").mkdir(parents=True)
+        (local_path / "src" / "main.py").write_text("print('hello')\n")
+        (local_path / ".git").mkdir()
+        (local_path / ".git" / "config").write_text("[remote]\n")
+        (local_path / ".env").write_text("TOKEN=secret\n")
+        (tmp_path / "secret.txt").write_text("secret\n")
+        mocker.patch.dict(
+            _WALKED_FILES,
+            {("repo-id", "user-repo"): frozenset({"src/main.py", "logo.png", "src/missing.py"})},
+        )
+        sliding_window_limiter.reset()
+        return local_path
+
+    def test_returns_file_content(self, client, cloned_repo):
+        """Test fetching the content of a file in the repository."""
+        response = client.get(
+            "/api/file-content",
+            params={"repo_id": "repo-id", "slug": "user-repo", "path": "src/main.py"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"success": True, "path": "src/main.py", "content": "print('hello')\n"}
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"repo_id": "repo-id", "slug": "user-repo", "path": "../../secret.txt"},
+            {"repo_id": "repo-id", "slug": "user-repo", "path": "/etc/passwd"},
+            {"repo_id": "..", "slug": "secret.txt", "path": "."},
+            {"repo_id": "repo-id", "slug": "user-repo", "path": ".git/config"},
+            {"repo_id": "repo-id", "slug": "user-repo", "path": "src/../.git/config"},
+        ],
+    )
+    def test_rejects_paths_outside_repository(self, client, cloned_repo, params):
+        """Test that paths escaping the cloned repository or reaching into ``.git`` are rejected even if walked."""
+        _WALKED_FILES[(params["repo_id"], params["slug"])] = frozenset({params["path"]})
+
+        response = client.get("/api/file-content", params=params)
+
+        assert response.status_code == 400
+        assert response.json()["success"] is False
+        assert response.json()["error"]
+
+    def test_elided_file(self, client, cloned_repo):
+        """Test that the content of binary files is not returned."""
+        (cloned_repo / "logo.png").write_bytes(b"\x89PNG\r\n")
+
+        response = client.get(
+            "/api/file-content",
+            params={"repo_id": "repo-id", "slug": "user-repo", "path": "logo.png"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"success": True, "path": "logo.png", "content": None, "content_elided": True}
+
+    def test_missing_file(self, client, cloned_repo):
+        """Test fetching a file that does not exist."""
+        response = client.get(
+            "/api/file-content",
+            params={"repo_id": "repo-id", "slug": "user-repo", "path": "src/missing.py"},
+        )
+
+        assert response.status_code == 404
+        assert response.json() == {"success": False, "error": "File not found"}
+
+    @pytest.mark.parametrize("path", [".env", "../../secret.txt", ".git/config"])
+    def test_rejects_files_not_walked(self, client, cloned_repo, path):
+        """Test that files on disk but left out of the tree explorer walk are not served."""
+        response = client.get("/api/file-content", params={"repo_id": "repo-id", "slug": "user-repo", "path": path})
+
+        assert response.status_code == 404
+        assert response.json() == {"success": False, "error": "File not found"}
+
+    def test_rejects_unknown_repository(self, client, cloned_repo):
+        """Test that clones the tree explorer did not walk, such as the main flow's, are not served."""
+        other_clone = cloned_repo.parent.parent / "other-id" / "user-repo"
+        other_clone.mkdir(parents=True)
+        (other_clone / "README.md").write_text("# Other\n")
+
+        response = client.get(
+            "/api/file-content",
+            params={"repo_id": "other-id", "slug": "user-repo", "path": "README.md"},
+        )
+
+        assert response.status_code == 404
+        assert response.json() == {"success": False, "error": "Unknown repository"}
+
+    async def test_walk_registers_files(self, walked_repository):
+        """Test that the walked files are the ones the file content endpoint will serve."""
+        walked_files = _WALKED_FILES.pop(("id", "user-repo"))
+
+        assert walked_files == {"README.md", "logo.png", "a/x.py", "b/y.py"}
+
+
+class TestCloneConcurrency:
+    """Test the bound on concurrent clones and walks."""
+
+    async def test_clones_are_bounded(self, tmp_path: Path, mocker: MockerFixture):
+        """Test that no more clones run at once than the semaphore allows."""
+        mocker.patch("server.routers.tree_explorer.CLONE_CONCURRENCY", 2)
+        mocker.patch("server.routers.tree_explorer._CLONE_SEMAPHORES", weakref.WeakKeyDictionary())
+        running = 0
+        peak = 0
+
+        async def slow_clone_repo(config, token=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            Path(config.local_path).mkdir(parents=True)
+            running -= 1
+
+        mocker.patch("server.routers.tree_explorer.clone_repo", AsyncMock(side_effect=slow_clone_repo))
+        queries = [
+            IngestionQuery(
+                url="https://github.com/user/repo",
+                local_path=tmp_path / str(i),
+                slug="user-repo",
+                id=str(i),
+            )
+            for i in range(5)
+        ]
+
+        await asyncio.gather(*(_walk_repository(query, token=None) for query in queries))
+
+        assert peak == 2
+
+    def test_semaphore_works_across_event_loops(self, tmp_path: Path, mocker: MockerFixture):
+        """Test that clones waiting for a slot work on every event loop, not just the first one to use it."""
+        mocker.patch("server.routers.tree_explorer.CLONE_CONCURRENCY", 1)
+
+        async def slow_clone_repo(config, token=None):
+            await asyncio.sleep(0.01)
+            Path(config.local_path).mkdir(parents=True)
+
+        mocker.patch("server.routers.tree_explorer.clone_repo", AsyncMock(side_effect=slow_clone_repo))
+
+        async def walk_concurrently(prefix: str) -> None:
+            queries = [
+                IngestionQuery(
+                    url="https://github.com/user/repo",
+                    local_path=tmp_path / f"{prefix}{i}",
+                    slug="user-repo",
+                    id=f"{prefix}{i}",
+                )
+                for i in range(3)
+            ]
+            await asyncio.gather(*(_walk_repository(query, token=None) for query in queries))
+
+        asyncio.run(walk_concurrently("first"))
+        asyncio.run(walk_concurrently("second"))
+
+        assert len(list(tmp_path.iterdir())) == 6
+
+    async def test_walk_runs_off_the_event_loop(self, tmp_path: Path, mocker: MockerFixture):
+        """Test that the filesystem walk runs in a worker thread."""
+        walk_threads = []
+        mocker.patch("server.routers.tree_explorer.clone_repo", AsyncMock())
+        mocker.patch(
+            "server.routers.tree_explorer._process_node",
+            side_effect=lambda **kwargs: walk_threads.append(threading.current_thread()),
+        )
+        query = IngestionQuery(url="https://github.com/user/repo", local_path=tmp_path, slug="user-repo", id="id")
+
+        await _walk_repository(query, token=None)
+
+        assert len(walk_threads) == 1
+        assert walk_threads[0] is not threading.current_thread()
+
+class TestContentPrefetch:
+    """Test reading file contents ahead of serialization."""
+
+    @staticmethod
+    def _prefetched_names(node: FileSystemNode) -> List[str]:
+        """Return the names of the files below ``node`` whose content has been read ahead."""
+        names = [node.name] if node.type == FileSystemNodeType.FILE and node.cached_content is not None else []
+        for child in node.children:
+            names.extend(TestContentPrefetch._prefetched_names(child))
+        return names
+
+    async def test_contents_are_prefetched(self, tmp_path: Path, walked_repository):
+        """Test that file contents are read up front, except those whose content is elided."""
+        await _prefetch_contents(walked_repository.root_node, breadth_first=False)
+
+        assert sorted(self._prefetched_names(walked_repository.root_node)) == ["README.md", "x.py", "y.py"]
+
+        # Serializing no longer reads from disk
+        (tmp_path / "README.md").unlink()
+        assert _filesystem_node_to_json(walked_repository.root_node)["children"][0]["content"] == "# Title\n"
+
+    async def test_prefetch_is_bounded_in_bytes(self, walked_repository):
+        """Test that prefetching stops once the byte budget is spent."""
+        await _prefetch_contents(walked_repository.root_node, breadth_first=False, max_bytes=10)
+
+        assert self._prefetched_names(walked_repository.root_node) == ["README.md"]
+
+    @pytest.mark.parametrize("breadth_first, expected", [(False, ["README.md", "x.py"]), (True, ["README.md"])])
+    async def test_prefetch_follows_layout_order(self, walked_repository, breadth_first, expected):
+        """Test that only the files emitted within the node budget, in the layout's order, are read ahead."""
+        await _prefetch_contents(walked_repository.root_node, breadth_first=breadth_first, max_nodes=5)
+
+        assert self._prefetched_names(walked_repository.root_node) == expected
+
+    @pytest.mark.parametrize("layout", ["nested", "columns"])
+    async def test_prefetched_contents_are_released(self, walked_repository, layout):
+        """Test that the contents read ahead for a response are dropped from the walk once it is encoded."""
+        response = await _tree_data_response(
+            walked_repository,
+            layout=layout,
+            include_content=True,
+            etag=None,
+            encoding_key=None,
+        )
+        if layout == "nested":
+            body = b"".join([chunk async for chunk in response.body_iterator])
+        else:
+            body = response.body
+
+        assert json.loads(body)["success"] is True
+        assert self._prefetched_names(walked_repository.root_node) == []
+
+
+class TestTreeDataRateLimit:
+    """Test the sliding-window rate limit of the tree data endpoint."""
+
+    @pytest.fixture(autouse=True)
+    def reset_rate_limit(self):
+        """Start every test with a fresh rate limit."""
+        sliding_window_limiter.reset()
+        yield
+        sliding_window_limiter.reset()
+
+    def test_rejects_requests_over_the_limit(self, mocker: MockerFixture):
+        """Test that the sixth request within a minute is rejected."""
+        mocker.patch("server.routers.tree_explorer.parse_query", AsyncMock(side_effect=ValueError("Invalid URL")))
+        client = TestClient(app, base_url="http://localhost")
+
+        statuses = [client.post("/api/tree-data", data={"repo_url": "bad"}).status_code for _ in range(6)]
+
+        assert statuses == [400] * 5 + [429]
+
+    def test_window_slides(self, mocker: MockerFixture):
+        """Test that requests older than the period no longer count, and idle clients are evicted."""
+        now = 1000.0
+        mocker.patch("server.server_utils.time.monotonic", side_effect=lambda: now)
+        limiter = SlidingWindowLimiter()
+
+        @limiter.limit("2/minute")
+        async def endpoint(request):
+            return "ok"
+
+        request = MagicMock()
+        request.client.host = "1.2.3.4"
+        assert asyncio.run(endpoint(request=request)) == "ok"
+        assert asyncio.run(endpoint(request=request)) == "ok"
+        assert asyncio.run(endpoint(request=request)).status_code == 429
+
+        now += 60
+        assert asyncio.run(endpoint(request=request)) == "ok"
+
+        now += 61
+        limiter.evict_idle()
+        assert not limiter._windows[0][1]
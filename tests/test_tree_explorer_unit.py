@@ -1,9 +1,18 @@
 """Unit tests for tree explorer functionality that don't require HTTP client."""
 
+import sys
 from pathlib import Path
 
+import orjson
+import pytest
+
 from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats
-from server.routers.tree_explorer import _filesystem_node_to_json
+from server.tree_serialization import (
+    _filesystem_node_to_columns,
+    _filesystem_node_to_flat,
+    _filesystem_node_to_json,
+    _iter_filesystem_node_json,
+)
 
 
 class TestTreeExplorerUnitTests:
@@ -203,6 +212,19 @@ class TestTreeExplorerLogic:
             ext = path.suffix.lower() if path.suffix else ""
             assert ext == expected_ext, f"Failed for {filename}: expected {expected_ext}, got {ext}"
 
+    def test_serialized_extension_matches_pathlib(self):
+        """Test that the serializer's extension slicing agrees with ``PurePath.suffix``."""
+        for filename in ["file.py", "FILE.PY", "file.tar.gz", "README", ".hidden", "file.", "..", "a.b."]:
+            path = Path(f"/test/{filename}")
+            node = FileSystemNode(
+                name=filename,
+                type=FileSystemNodeType.FILE,
+                path_str=f"/test/{filename}",
+                path=path,
+            )
+            expected_ext = path.suffix.lower() if path.suffix else ""
+            assert _filesystem_node_to_json(node)["extension"] == expected_ext, f"Failed for {filename}"
+
     def test_tree_depth_tracking(self):
         """Test that tree depth is properly tracked."""
         # Root level
@@ -250,3 +272,403 @@ class TestTreeExplorerLogic:
         assert result["depth"] == 0
         assert result["children"][0]["depth"] == 1
         assert result["children"][0]["children"][0]["depth"] == 2
+
+    def test_deep_tree_does_not_hit_recursion_limit(self):
+        """Test that very deep trees are converted without recursion errors."""
+        depth = sys.getrecursionlimit() + 100
+        root = FileSystemNode(
+            name="root",
+            type=FileSystemNodeType.DIRECTORY,
+            path_str="root",
+            path=Path("/root"),
+        )
+
+        current = root
+        for level in range(1, depth + 1):
+            child = FileSystemNode(
+                name=f"d{level}",
+                type=FileSystemNodeType.DIRECTORY,
+                path_str=f"{current.path_str}/d{level}",
+                path=current.path / f"d{level}",
+                depth=level,
+            )
+            current.children = [child]
+            current = child
+
+        result = _filesystem_node_to_json(root, max_depth=depth)
+
+        for level in range(1, depth + 1):
+            result = result["children"][0]
+            assert result["depth"] == level
+        assert result["children"] == []
+
+    def test_filesystem_node_to_columns(self):
+        """Test converting a tree to the column layout."""
+        child_file = FileSystemNode(
+            name="child.PY",
+            type=FileSystemNodeType.FILE,
+            path_str="src/child.PY",
+            path=Path("/test/src/child.PY"),
+            size=50,
+            depth=2,
+        )
+        sub_dir = FileSystemNode(
+            name="src",
+            type=FileSystemNodeType.DIRECTORY,
+            path_str="src",
+            path=Path("/test/src"),
+            size=50,
+            depth=1,
+            file_count=1,
+            children=[child_file],
+        )
+        readme = FileSystemNode(
+            name="README",
+            type=FileSystemNodeType.FILE,
+            path_str="README",
+            path=Path("/test/README"),
+            size=10,
+            depth=1,
+        )
+        root = FileSystemNode(
+            name="test",
+            type=FileSystemNodeType.DIRECTORY,
+            path_str=".",
+            path=Path("/test"),
+            size=60,
+            file_count=2,
+            dir_count=1,
+            children=[readme, sub_dir],
+        )
+
+        result = _filesystem_node_to_columns(root)
+
+        assert result["layout"] == "columns"
+        assert result["names"] == ["test", "README", "src", "child.PY"]
+        assert result["types"] == ["directory", "file", "directory", "file"]
+        assert result["parents"] == [-1, 0, 0, 2]
+        assert result["depths"] == [0, 1, 1, 2]
+        assert result["extensions"] == ["", "", "", ".py"]
+        assert result["contents"] == [None, readme.content, None, child_file.content]
+        assert result["children_offsets"] == [0, 2, 2, 3, 3]
+        assert result["child_ids"] == [1, 2, 3]
+
+    def test_filesystem_node_to_flat(self):
+        """Test converting a tree to the flat layout."""
+        child_file = FileSystemNode(
+            name="child.py",
+            type=FileSystemNodeType.FILE,
+            path_str="src/child.py",
+            path=Path("/test/src/child.py"),
+            size=50,
+            depth=2,
+        )
+        sub_dir = FileSystemNode(
+            name="src",
+            type=FileSystemNodeType.DIRECTORY,
+            path_str="src",
+            path=Path("/test/src"),
+            size=50,
+            depth=1,
+            file_count=1,
+            children=[child_file],
+        )
+        readme = FileSystemNode(
+            name="README",
+            type=FileSystemNodeType.FILE,
+            path_str="README",
+            path=Path("/test/README"),
+            size=10,
+            depth=1,
+        )
+        root = FileSystemNode(
+            name="test",
+            type=FileSystemNodeType.DIRECTORY,
+            path_str=".",
+            path=Path("/test"),
+            size=60,
+            file_count=2,
+            dir_count=1,
+            children=[sub_dir, readme],
+        )
+
+        result = _filesystem_node_to_flat(root, include_content=False)
+
+        assert result["layout"] == "flat"
+        assert [node["name"] for node in result["nodes"]] == ["test", "src", "README", "child.py"]
+        assert result["parents"] == [-1, 0, 0, 1]
+        assert result["nodes"][3] == {
+            "name": "child.py",
+            "type": "file",
+            "path": "src/child.py",
+            "size": 50,
+            "file_count": 0,
+            "dir_count": 0,
+            "extension": ".py",
+        }
+        assert all("children" not in node and "depth" not in node for node in result["nodes"])
+
+    def test_iter_filesystem_node_json_matches_nested_layout(self, tmp_path: Path):
+        """Test that streaming the tree encodes the same document as the nested serializer."""
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "main.py").write_text('print("héllo")\n')
+        (tmp_path / "README.md").write_text("# Title\n")
+
+        root = FileSystemNode(
+            name="repo",
+            type=FileSystemNodeType.DIRECTORY,
+            path_str=".",
+            path=tmp_path,
+            file_count=2,
+            dir_count=1,
+        )
+        src = FileSystemNode(
+            name="src",
+            type=FileSystemNodeType.DIRECTORY,
+            path_str="src",
+            path=tmp_path / "src",
+            depth=1,
+            file_count=1,
+        )
+        src.children = [
+            FileSystemNode(
+                name="main.py",
+                type=FileSystemNodeType.FILE,
+                path_str="src/main.py",
+                path=tmp_path / "src" / "main.py",
+                depth=2,
+            )
+        ]
+        empty = FileSystemNode(
+            name="empty",
+            type=FileSystemNodeType.DIRECTORY,
+            path_str="empty",
+            path=tmp_path / "empty",
+            depth=1,
+        )
+        readme = FileSystemNode(
+            name="README.md",
+            type=FileSystemNodeType.FILE,
+            path_str="README.md",
+            path=tmp_path / "README.md",
+            depth=1,
+        )
+        root.children = [readme, src, empty]
+
+        chunks = list(_iter_filesystem_node_json(root, chunk_size=16))
+
+        assert len(chunks) > 1
+        assert orjson.loads(b"".join(chunks)) == _filesystem_node_to_json(root)
+
+
+class TestTreeLimits:
+    """Test the node-count and depth limits applied when serializing trees."""
+
+    @pytest.fixture
+    def wide_tree(self) -> FileSystemNode:
+        """Create a tree with two directories of three files each, nested under ``a``."""
+        root = FileSystemNode(name="root", type=FileSystemNodeType.DIRECTORY, path_str=".", path=Path("/root"))
+        outer = FileSystemNode(
+            name="a",
+            type=FileSystemNodeType.DIRECTORY,
+            path_str="a",
+            path=Path("/root/a"),
+            depth=1,
+        )
+        root.children = [outer]
+        for dir_name in ("b", "c"):
+            directory = FileSystemNode(
+                name=dir_name,
+                type=FileSystemNodeType.DIRECTORY,
+                path_str=f"a/{dir_name}",
+                path=Path(f"/root/a/{dir_name}"),
+                depth=2,
+            )
+            directory.children = [
+                FileSystemNode(
+                    name=f"{i}.txt",
+                    type=FileSystemNodeType.SYMLINK,
+                    path_str=f"a/{dir_name}/{i}.txt",
+                    path=Path(f"/root/a/{dir_name}/{i}.txt"),
+                    depth=3,
+                )
+                for i in range(3)
+            ]
+            outer.children.append(directory)
+        return root
+
+    def test_node_limit(self, wide_tree):
+        """Test that nodes past the limit are dropped and their directories flagged."""
+        warnings = []
+
+        result = _filesystem_node_to_json(wide_tree, max_nodes=5, warnings=warnings)
+
+        outer = result["children"][0]
+        assert [child["name"] for child in outer["children"]] == ["b"]
+        assert [child["name"] for child in outer["children"][0]["children"]] == ["0.txt", "1.txt"]
+        assert outer["truncated"] is True
+        assert outer["children"][0]["truncated"] is True
+        assert "truncated" not in result
+        assert len(warnings) == 1
+        assert "5" in warnings[0]
+
+    def test_depth_limit(self, wide_tree):
+        """Test that directories at the depth limit are emitted without their children."""
+        warnings = []
+
+        result = _filesystem_node_to_json(wide_tree, max_depth=2, warnings=warnings)
+
+        directories = result["children"][0]["children"]
+        assert [child["name"] for child in directories] == ["b", "c"]
+        assert all(child["children"] == [] and child["truncated"] for child in directories)
+        assert len(warnings) == 1
+        assert "2 levels" in warnings[0]
+
+    def test_within_limits(self, wide_tree):
+        """Test that complete trees carry no truncation flags or warnings."""
+        warnings = []
+
+        columns = _filesystem_node_to_columns(wide_tree, warnings=warnings)
+
+        assert columns["truncated"] == []
+        assert warnings == []
+
+    @pytest.mark.parametrize("limits", [{"max_nodes": 5}, {"max_nodes": 3}, {"max_depth": 2}, {"max_depth": 1}])
+    def test_layouts_agree_on_truncation(self, wide_tree, limits):
+        """Test that the streaming and column layouts truncate the same nodes as the nested layout."""
+        nested_warnings, streamed_warnings, columns_warnings = [], [], []
+
+        nested = _filesystem_node_to_json(wide_tree, warnings=nested_warnings, **limits)
+        streamed = b"".join(_iter_filesystem_node_json(wide_tree, warnings=streamed_warnings, **limits))
+        columns = _filesystem_node_to_columns(wide_tree, warnings=columns_warnings, **limits)
+
+        assert orjson.loads(streamed) == nested
+        assert streamed_warnings == columns_warnings == nested_warnings
+        assert [columns["paths"][i] for i in columns["truncated"]] == sorted(
+            _truncated_paths(nested), key=columns["paths"].index
+        )
+
+    @pytest.mark.parametrize(
+        "serialize",
+        [
+            _filesystem_node_to_json,
+            _filesystem_node_to_columns,
+            _filesystem_node_to_flat,
+            lambda node, **limits: b"".join(_iter_filesystem_node_json(node, **limits)),
+        ],
+    )
+    def test_zero_node_budget_is_rejected(self, wide_tree, serialize):
+        """Test that every layout rejects a node budget with no room for the root."""
+        with pytest.raises(ValueError, match="max_nodes"):
+            serialize(wide_tree, max_nodes=0)
+
+    def test_single_node_budget(self, wide_tree):
+        """Test that a budget of one node emits only the root, flagged as truncated."""
+        streamed = b"".join(_iter_filesystem_node_json(wide_tree, max_nodes=1))
+
+        assert orjson.loads(streamed) == _filesystem_node_to_json(wide_tree, max_nodes=1)
+        assert orjson.loads(streamed)["truncated"] is True
+        assert _filesystem_node_to_columns(wide_tree, max_nodes=1)["truncated"] == [0]
+        assert _filesystem_node_to_flat(wide_tree, max_nodes=1)["nodes"][0]["truncated"] is True
+
+    def test_flat_node_limit(self, wide_tree):
+        """Test that the flat layout spends the node budget level by level."""
+        warnings = []
+
+        result = _filesystem_node_to_flat(wide_tree, max_nodes=5, warnings=warnings)
+
+        assert [node["path"] for node in result["nodes"]] == [".", "a", "a/b", "a/c", "a/b/0.txt"]
+        assert [node["path"] for node in result["nodes"] if node.get("truncated")] == ["a/b", "a/c"]
+        assert len(warnings) == 1
+
+    @pytest.mark.parametrize("max_depth", [1, 2])
+    def test_flat_depth_limit_agrees(self, wide_tree, max_depth):
+        """Test that the flat layout stops at the same depth as the nested layout."""
+        nested = _filesystem_node_to_json(wide_tree, max_depth=max_depth)
+        flat = _filesystem_node_to_flat(wide_tree, max_depth=max_depth)
+
+        assert sorted(node["path"] for node in flat["nodes"] if node.get("truncated")) == sorted(
+            _truncated_paths(nested)
+        )
+
+
+def _truncated_paths(node: dict) -> list:
+    """Return the paths of the truncated directories in a nested tree."""
+    paths = [node["path"]] if node.get("truncated") else []
+    for child in node.get("children", []):
+        paths.extend(_truncated_paths(child))
+    return paths
+
+
+class TestContentElision:
+    """Test that the content of binary, minified and oversized files is not read."""
+
+    @pytest.fixture
+    def mixed_tree(self, tmp_path: Path) -> FileSystemNode:
+        """Create a directory holding a text file, a binary asset, a minified bundle and a large file."""
+        files = {
+            "main.py": b"print('hello')\n",
+            "logo.PNG": b"\x89PNG\r\n",
+            "app.min.js": b"var a=1;",
+            "big.txt": b"a" * (256 * 1024 + 1),
+        }
+        root = FileSystemNode(name="root", type=FileSystemNodeType.DIRECTORY, path_str=".", path=tmp_path)
+        for name, data in files.items():
+            (tmp_path / name).write_bytes(data)
+            root.children.append(
+                FileSystemNode(
+                    name=name,
+                    type=FileSystemNodeType.FILE,
+                    path_str=name,
+                    path=tmp_path / name,
+                    size=len(data),
+                    depth=1,
+                )
+            )
+        return root
+
+    def test_elided_files_are_not_read(self, mixed_tree):
+        """Test that elided files get a marker instead of their content."""
+        result = _filesystem_node_to_json(mixed_tree)
+
+        contents = {child["name"]: child for child in result["children"]}
+        assert contents["main.py"]["content"] == "print('hello')\n"
+        assert "content_elided" not in contents["main.py"]
+        for name in ("logo.PNG", "app.min.js", "big.txt"):
+            assert contents[name]["content"] is None
+            assert contents[name]["content_elided"] is True
+
+    def test_layouts_agree_on_elision(self, mixed_tree):
+        """Test that the streaming and column layouts elide the same files as the nested layout."""
+        nested = _filesystem_node_to_json(mixed_tree)
+        streamed = b"".join(_iter_filesystem_node_json(mixed_tree))
+        columns = _filesystem_node_to_columns(mixed_tree)
+
+        assert orjson.loads(streamed) == nested
+        assert [columns["names"][i] for i in columns["content_elided"]] == ["logo.PNG", "app.min.js", "big.txt"]
+        assert [columns["contents"][i] for i in columns["content_elided"]] == [None, None, None]
+
+    def test_no_marker_without_content(self, mixed_tree):
+        """Test that the marker is left out along with the content."""
+        result = _filesystem_node_to_json(mixed_tree, include_content=False)
+
+        assert all("content_elided" not in child for child in result["children"])
+        assert "content_elided" not in _filesystem_node_to_columns(mixed_tree, include_content=False)
+
+
+class TestFileSystemNodeSlots:
+    """Test the memory layout of FileSystemNode."""
+
+    @pytest.mark.skipif(sys.version_info < (3, 10), reason="dataclass slots require Python 3.10")
+    def test_nodes_have_no_instance_dict(self):
+        """Test that nodes store their fields in slots rather than a per-instance dict."""
+        node = FileSystemNode(
+            name="test.py",
+            type=FileSystemNodeType.FILE,
+            path_str="test.py",
+            path=Path("/test/test.py"),
+        )
+
+        assert not hasattr(node, "__dict__")
+        with pytest.raises(AttributeError):
+            node.unknown_attribute = 1